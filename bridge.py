@@ -1,7 +1,8 @@
-import re, sys, time, threading
+import os, re, sys, time, threading, queue, selectors
 import pygame.midi as pm
 import serial
 from serial.tools import list_ports
+from regex import RE_B_NH, RE_B_VH, RE_B_SUS, RE_B_OCT, RE_B_PAN, RE_P, RE_V, RE_E
 
 # =========================
 # Config (easy to tweak)
@@ -10,6 +11,7 @@ LOOPMIDI_NAME   = "theremin port"
 BAUD            = 115200
 LOG_EVERY_LINE  = True    # set False to reduce console spam
 DEADBAND_CC     = 2       # min CC change to send
+CC_MIN_INTERVAL = 0.005   # s between sends of the same CC per device
 OCT_MIN, OCT_MAX = -24, 36  # semitone clamp for octave offset (±2 to +3 octaves)
 
 CC_MAP = {  # effect name -> CC number
@@ -21,24 +23,29 @@ CC_MAP = {  # effect name -> CC number
     "MOD": 1,    # modulation wheel
 }
 DEFAULT_VELOCITY = 96
+STRICT          = "--strict" in sys.argv[1:]  # also validate every line with the regex.py patterns
 
 # =========================
-# Regex (strict & readable)
+# Console log (off the hot path)
 # =========================
-NUM_0_127 = r'(?:12[0-7]|1[01]\d|\d{1,2})'
-DEV       = r'(?P<dev>\d{1,3})'
-NOTE_NAME = r'(?:[A-Ga-g][#b]?-?\d+)'
-NOTE_ANY  = rf'(?P<note>(?:{NOTE_NAME}|{NUM_0_127}))'
+LOG_Q = queue.Queue(maxsize=4096)
 
-RE_B_NH   = re.compile(rf'^B,{DEV},NH,(?P<state>[01])$')
-RE_B_VH   = re.compile(rf'^B,{DEV},VH,(?P<state>[01])$')
-RE_B_SUS  = re.compile(rf'^B,{DEV},SUS,(?P<state>[01])$')
-RE_B_OCT  = re.compile(rf'^B,{DEV},OCT,(?P<delta>[+-]?\d{{1,2}})$')
-RE_B_PAN  = re.compile(rf'^B,{DEV},PANIC,1$')
+def log(s):
+    try:
+        LOG_Q.put_nowait(s)
+    except queue.Full:
+        pass  # drop rather than stall a reader
 
-RE_P      = re.compile(rf'^P,{DEV},{NOTE_ANY}$')
-RE_V      = re.compile(rf'^V,{DEV},(?P<val>{NUM_0_127})$')
-RE_E      = re.compile(rf'^E,{DEV},(?P<param>CUT|RESO|REV|DEL|MOD|PAN),(?P<val>{NUM_0_127})$')
+def log_pump():
+    while True:
+        lines = [LOG_Q.get()]
+        try:
+            while True:
+                lines.append(LOG_Q.get_nowait())
+        except queue.Empty:
+            pass
+        sys.stdout.writelines(f"{s}\n" for s in lines)
+        sys.stdout.flush()
 
 # =========================
 # MIDI out (pygame.midi)
@@ -58,39 +65,162 @@ def open_loopmidi(name_hint):
 
 midi = open_loopmidi(LOOPMIDI_NAME)
 
+# Readers only queue raw (status, data1, data2); midi_pump owns the port.
+# Callers pass notes already clamped to 0..127, so a mask is enough here.
+midi_q = queue.SimpleQueue()
+
+MIDI_CHANNEL   = 0                     # 0..15 (MIDI channel 1..16)
+NOTE_ON_STATUS = 0x90 | MIDI_CHANNEL
+CC_STATUS      = 0xB0 | MIDI_CHANNEL
+MIDI_WRITE_MAX = 1024                  # pygame.midi Output.write() event limit
+
 def midi_note_on(note, vel):
-    vel = max(1, min(127, vel))
-    note = max(0, min(127, note))
-    midi.note_on(note, vel)
+    midi_q.put((NOTE_ON_STATUS, note & 0x7F, 1 if vel < 1 else 127 if vel > 127 else vel))
 
 def midi_note_off(note):
-    note = max(0, min(127, note))
-    midi.note_off(note, 0)
+    # note-on with velocity 0 == note-off, and keeps one status byte for running status
+    midi_q.put((NOTE_ON_STATUS, note & 0x7F, 0))
 
 def midi_cc(cc, val):
-    val = max(0, min(127, val))
-    midi.write_short(0xB0, cc & 0x7F, val)
+    midi_q.put((CC_STATUS, cc & 0x7F, clamp0_127(val)))
+
+def coalesce(batch):
+    # keep only the newest value per controller; notes pass through in order
+    seen = set()
+    out = []
+    for msg in reversed(batch):
+        if msg[0] & 0xF0 == 0xB0:
+            key = (msg[0], msg[1])
+            if key in seen: continue
+            seen.add(key)
+        out.append(msg)
+    out.reverse()
+    return out
+
+def midi_pump():
+    while True:
+        try:
+            batch = [midi_q.get(timeout=CC_MIN_INTERVAL)]
+        except queue.Empty:
+            batch = []
+        now = time.perf_counter()
+        for st in list(DEVICES.values()):
+            st.flush_cc(now)
+        try:
+            while True:
+                batch.append(midi_q.get_nowait())
+        except queue.Empty:
+            pass
+        # one PortMidi call per burst: [[status, d1, d2, 0], timestamp] events
+        events = [[[st, d1, d2, 0], 0] for st, d1, d2 in coalesce(batch)]
+        for i in range(0, len(events), MIDI_WRITE_MAX):
+            midi.write(events[i:i+MIDI_WRITE_MAX])
 
 # =========================
 # Utilities
 # =========================
+# specialized clamps: no lo/hi arguments to bind on the hot path
+def clamp0_127(v): return 0 if v < 0 else 127 if v > 127 else v
+def clamp_oct(v): return OCT_MIN if v < OCT_MIN else OCT_MAX if v > OCT_MAX else v
+
 NOTE_BASE = {'C':0,'D':2,'E':4,'F':5,'G':7,'A':9,'B':11}
+
+def note_number(letter, acc, octv):
+    pc = NOTE_BASE[letter.upper()]
+    if acc == '#': pc += 1
+    elif acc == 'b': pc -= 1
+    num = 12*(octv+1) + pc  # C-1=0
+    return clamp0_127(num)
+
+def build_note_table():
+    # every spelling the gloves can send -> MIDI number (keys are raw bytes)
+    table = {}
+    for octv in range(-1, 10):
+        for letter in NOTE_BASE:
+            for acc in ("", "#", "b"):
+                num = note_number(letter, acc, octv)
+                table[f"{letter}{acc}{octv}".encode()] = num
+                table[f"{letter.lower()}{acc}{octv}".encode()] = num
+    for num in range(128):
+        table[str(num).encode()] = num
+    return table
+
+NOTE_TABLE = build_note_table()
+
+NOTE_RE = re.compile(rb'([A-Ga-g])([#b]?)(-?\d+)')
+
 def note_name_to_number(name):
-    # Accept C4, F#5, Db3 or raw "0..127"
-    m = re.fullmatch(r'([A-Ga-g])([#b]?)(-?\d+)', name)
-    if m:
-        letter, acc, octv = m.groups()
-        pc = NOTE_BASE[letter.upper()]
-        if acc == '#': pc += 1
-        elif acc == 'b': pc -= 1
-        num = 12*(int(octv)+1) + pc  # C-1=0
-        return max(0, min(127, num))
-    try:
-        return max(0, min(127, int(name)))
-    except:
-        return 60  # default C4
+    # C4, F#5, Db3 or raw "0..127" (bytes) -> MIDI number, -1 if malformed
+    num = NOTE_TABLE.get(name)
+    return num if num is not None else _note_slow_path(name)
+
+def _note_slow_path(name):
+    # note names outside the table, e.g. C12; -1 if not a note name at all
+    m = NOTE_RE.fullmatch(name)
+    if not m:
+        return -1
+    letter, acc, octv = m.group(1).decode(), m.group(2).decode(), int(m.group(3))
+    return note_number(letter, acc, octv)
+
+def field_0_127(s):
+    # plain decimal 0..127 (no leading zeros) -> int, anything else -> -1
+    if s.isdigit() and len(s) <= 3 and (len(s) == 1 or s[0] != 48):
+        v = int(s)
+        if v <= 127: return v
+    return -1
+
+def field_dev(s):
+    return int(s) if s.isdigit() and len(s) <= 3 else -1
 
-def clamp(v, lo, hi): return lo if v < lo else hi if v > hi else v
+# =========================
+# Parser: raw line -> (kind, dev, arg1, arg2)
+# =========================
+# Works on the undecoded bytes and returns plain ints, so handlers never
+# touch strings. Kind codes index STRICT_RE and HANDLERS.
+K_NH, K_VH, K_SUS, K_OCT, K_PANIC, K_P, K_V, K_E = range(8)
+B_KINDS = {b"NH": K_NH, b"VH": K_VH, b"SUS": K_SUS, b"OCT": K_OCT, b"PANIC": K_PANIC}
+CC_BY_PARAM = {name.encode(): cc for name, cc in CC_MAP.items()}
+PARAM_BY_CC = {cc: name for name, cc in CC_MAP.items()}  # for logging only
+STRICT_RE = (RE_B_NH, RE_B_VH, RE_B_SUS, RE_B_OCT, RE_B_PAN, RE_P, RE_V, RE_E)
+
+def parse_fields(parts):
+    n = len(parts)
+    if n < 3: return None
+    tag = parts[0]
+    dev = field_dev(parts[1])
+    if dev < 0: return None
+
+    if n == 3:
+        if tag == b"P":
+            note = note_name_to_number(parts[2])
+            return (K_P, dev, note, 0) if note >= 0 else None
+        if tag == b"V":
+            val = field_0_127(parts[2])
+            return (K_V, dev, val, 0) if val >= 0 else None
+        return None
+    if n != 4: return None
+
+    if tag == b"E":
+        cc = CC_BY_PARAM.get(parts[2]); val = field_0_127(parts[3])
+        return (K_E, dev, cc, val) if cc is not None and val >= 0 else None
+    if tag != b"B": return None
+    kind = B_KINDS.get(parts[2]); arg = parts[3]
+    if kind == K_OCT:
+        # optional sign + 1..2 digits, as RE_B_OCT
+        digits = arg[1:] if arg[:1] in (b"+", b"-") else arg
+        if not (1 <= len(digits) <= 2 and digits.isdigit()): return None
+        return (K_OCT, dev, int(arg), 0)
+    if kind == K_PANIC:
+        return (K_PANIC, dev, 0, 0) if arg == b"1" else None
+    if kind is not None and (arg == b"0" or arg == b"1"):
+        return (kind, dev, arg[0] - 48, 0)
+    return None
+
+def parse_line(line):
+    msg = parse_fields(line.split(b","))
+    if STRICT and msg is not None and not STRICT_RE[msg[0]].match(line.decode('ascii', errors='ignore')):
+        return None
+    return msg
 
 # =========================
 # Per-device state
@@ -105,12 +235,34 @@ class DevState:
         self.current_note = None       # sounding due to NH
         self.sustained_note = None     # sounding due to SUS
         self.last_cc_vals = {}         # for deadband
+        self.last_cc_time = {}         # cc -> perf_counter() time of last send
+        self.pending_cc = {}           # cc -> newest value held back by CC_MIN_INTERVAL
+        self.cc_lock = threading.Lock()  # reader thread vs midi_pump
 
     def cc_send(self, cc, val):
-        prev = self.last_cc_vals.get(cc)
-        if prev is None or abs(val - prev) >= DEADBAND_CC:
-            midi_cc(cc, val)
-            self.last_cc_vals[cc] = val
+        with self.cc_lock:
+            prev = self.last_cc_vals.get(cc)
+            # two compares instead of an abs() call
+            if prev is not None and -DEADBAND_CC < val - prev < DEADBAND_CC:
+                self.pending_cc.pop(cc, None)  # back within deadband of what was sent
+                return
+            self.pending_cc[cc] = val
+            now = time.perf_counter()
+            if now - self.last_cc_time.get(cc, 0.0) >= CC_MIN_INTERVAL:
+                self._flush_cc(cc, now)
+
+    def flush_cc(self, now):
+        # send held-back values whose interval has elapsed
+        with self.cc_lock:
+            for cc in list(self.pending_cc):
+                if now - self.last_cc_time.get(cc, 0.0) >= CC_MIN_INTERVAL:
+                    self._flush_cc(cc, now)
+
+    def _flush_cc(self, cc, now):
+        val = self.pending_cc.pop(cc)
+        midi_cc(cc, val)
+        self.last_cc_vals[cc] = val
+        self.last_cc_time[cc] = now
 
 DEVICES = {}  # dev_id:int -> DevState
 def S(dev_id):  # get state
@@ -120,69 +272,60 @@ def S(dev_id):  # get state
         DEVICES[dev_id] = st
     return st
 
+
 # =========================
-# Handlers
+# Handlers (dev, arg1, arg2)
 # =========================
-def handle_button(line):
-    m = (RE_B_NH.match(line) or RE_B_VH.match(line) or RE_B_SUS.match(line) or
-         RE_B_OCT.match(line) or RE_B_PAN.match(line))
-    if not m: return False
-    dev = int(m.group('dev')); st = S(dev)
-
-    if RE_B_NH.match(line):
-        state = int(m.group('state'))
-        if LOG_EVERY_LINE: print(f"[B] dev{dev} NH={state}")
-        prev = st.note_hold
-        st.note_hold = state
-        if prev == 1 and state == 0 and st.sustain_on == 0:
-            # releasing NH -> stop non-sustained current note
-            if st.current_note is not None:
-                midi_note_off(st.current_note); st.current_note = None
-        # if pressing NH and we already have a pitch waiting, we’ll trigger on next P
-
-    elif RE_B_VH.match(line):
-        state = int(m.group('state'))
-        if LOG_EVERY_LINE: print(f"[B] dev{dev} VH={state}")
-        st.vol_hold = state
-
-    elif RE_B_SUS.match(line):
-        state = int(m.group('state'))
-        if LOG_EVERY_LINE: print(f"[B] dev{dev} SUS={state}")
-        if state == 1:
-            st.sustain_on = 1
-            # if a current note exists, promote it to sustained
-            if st.current_note is not None:
-                st.sustained_note = st.current_note
-        else:
-            st.sustain_on = 0
-            # sustain OFF -> stop sustained
-            if st.sustained_note is not None:
-                midi_note_off(st.sustained_note)
-                st.sustained_note = None
-
-    elif RE_B_OCT.match(line):
-        delta = int(m.group('delta'))
-        st.octave_offset = clamp(st.octave_offset + 12*delta, OCT_MIN, OCT_MAX)
-        if LOG_EVERY_LINE: print(f"[B] dev{dev} OCT offset={st.octave_offset}")
-
-    elif RE_B_PAN.match(line):
-        # PANIC = sustain off ONLY (your requirement)
-        if LOG_EVERY_LINE: print(f"[B] dev{dev} PANIC -> sustain off only")
+def handle_note_hold(dev, state, _):
+    st = S(dev)
+    if LOG_EVERY_LINE: log(f"[B] dev{dev} NH={state}")
+    prev = st.note_hold
+    st.note_hold = state
+    if prev == 1 and state == 0 and st.sustain_on == 0:
+        # releasing NH -> stop non-sustained current note
+        if st.current_note is not None:
+            midi_note_off(st.current_note); st.current_note = None
+    # if pressing NH and we already have a pitch waiting, we’ll trigger on next P
+
+def handle_vol_hold(dev, state, _):
+    st = S(dev)
+    if LOG_EVERY_LINE: log(f"[B] dev{dev} VH={state}")
+    st.vol_hold = state
+
+def handle_sustain(dev, state, _):
+    st = S(dev)
+    if LOG_EVERY_LINE: log(f"[B] dev{dev} SUS={state}")
+    if state == 1:
+        st.sustain_on = 1
+        # if a current note exists, promote it to sustained
+        if st.current_note is not None:
+            st.sustained_note = st.current_note
+    else:
         st.sustain_on = 0
+        # sustain OFF -> stop sustained
         if st.sustained_note is not None:
             midi_note_off(st.sustained_note)
             st.sustained_note = None
 
-    return True
+def handle_octave(dev, delta, _):
+    st = S(dev)
+    st.octave_offset = clamp_oct(st.octave_offset + 12*delta)
+    if LOG_EVERY_LINE: log(f"[B] dev{dev} OCT offset={st.octave_offset}")
+
+def handle_panic(dev, _a, _b):
+    st = S(dev)
+    # PANIC = sustain off ONLY (your requirement)
+    if LOG_EVERY_LINE: log(f"[B] dev{dev} PANIC -> sustain off only")
+    st.sustain_on = 0
+    if st.sustained_note is not None:
+        midi_note_off(st.sustained_note)
+        st.sustained_note = None
 
-def handle_pitch(line):
-    m = RE_P.match(line)
-    if not m: return False
-    dev = int(m.group('dev')); st = S(dev)
-    note = note_name_to_number(m.group('note'))
-    note = clamp(note + st.octave_offset, 0, 127)
+def handle_pitch(dev, note, _):
+    st = S(dev)
+    note = clamp0_127(note + st.octave_offset)
 
-    if LOG_EVERY_LINE: print(f"[P] dev{dev} pitch={note} NH={st.note_hold} SUS={st.sustain_on}")
+    if LOG_EVERY_LINE: log(f"[P] dev{dev} pitch={note} NH={st.note_hold} SUS={st.sustain_on}")
 
     if st.note_hold == 1:
         # with sustain on: replace sustained note if different
@@ -204,34 +347,27 @@ def handle_pitch(line):
         # NH not held: just remember; no sound
         pass
 
-    return True
-
-def handle_volume(line):
-    m = RE_V.match(line)
-    if not m: return False
-    dev = int(m.group('dev')); st = S(dev)
-    val = int(m.group('val'))
+def handle_volume(dev, val, _):
+    st = S(dev)
     st.last_volume = val
-    if LOG_EVERY_LINE: print(f"[V] dev{dev} vol={val} VH={st.vol_hold}")
+    if LOG_EVERY_LINE: log(f"[V] dev{dev} vol={val} VH={st.vol_hold}")
     # while VH held, send as expression (CC11) with deadband
     if st.vol_hold == 1:
         st.cc_send(11, val)  # CC11 Expression
-    return True
-
-def handle_effect(line):
-    m = RE_E.match(line)
-    if not m: return False
-    dev = int(m.group('dev')); st = S(dev)
-    param = m.group('param'); val = int(m.group('val'))
-    if LOG_EVERY_LINE: print(f"[E] dev{dev} {param}={val} VH={st.vol_hold}")
+
+def handle_effect(dev, cc, val):
+    st = S(dev)
+    if LOG_EVERY_LINE: log(f"[E] dev{dev} {PARAM_BY_CC[cc]}={val} VH={st.vol_hold}")
     if st.vol_hold == 1:
-        cc = CC_MAP.get(param)
-        if cc is not None:
-            st.cc_send(cc, val)
-    return True
+        st.cc_send(cc, val)
+
+HANDLERS = (  # indexed by kind code
+    handle_note_hold, handle_vol_hold, handle_sustain, handle_octave, handle_panic,
+    handle_pitch, handle_volume, handle_effect,
+)
 
 # =========================
-# Serial readers
+# Serial reader (single thread, all ports)
 # =========================
 def find_microbit_ports():
     hits = []
@@ -241,29 +377,90 @@ def find_microbit_ports():
             hits.append(p.device)
     return hits
 
-def reader_thread(port_name):
-    try:
-        with serial.Serial(port_name, BAUD, timeout=0.2) as ser:
-            print(f"[SER] open {port_name} @ {BAUD}")
-            buf = b""
-            while True:
-                data = ser.read(1024)
-                if not data:
-                    continue
-                buf += data
-                while b"\n" in buf:
-                    line, buf = buf.split(b"\n", 1)
-                    text = line.decode('utf-8', errors='ignore').strip("\r").strip()
-                    if not text: continue
-                    if LOG_EVERY_LINE: print("[RX]", text)
-                    # dispatch
-                    if handle_button(text): continue
-                    if handle_pitch(text):  continue
-                    if handle_volume(text): continue
-                    if handle_effect(text): continue
-                    if LOG_EVERY_LINE: print("[SKIP] Unmatched:", text)
-    except Exception as e:
-        print(f"[SER] {port_name} error:", e)
+LINE_JUNK = b"\r\t "  # bytes dropped from every line (protocol has no spaces)
+RING_SIZE = 4096       # per-port receive buffer; a line longer than this is dropped
+
+def dispatch_line(line):
+    if LOG_EVERY_LINE: log(f"[RX] {line.decode('utf-8', errors='ignore')}")
+    msg = parse_line(line)
+    if msg is None:
+        if LOG_EVERY_LINE: log(f"[SKIP] Unmatched: {line.decode('utf-8', errors='ignore')}")
+        return
+    # dispatch on message type
+    kind, dev, arg1, arg2 = msg
+    HANDLERS[kind](dev, arg1, arg2)
+
+class PortReader:
+    """One open serial port plus its receive ring buffer."""
+    def __init__(self, port_name):
+        self.name = port_name
+        self.ser = serial.Serial(port_name, BAUD, timeout=0)  # non-blocking reads
+        self.ring = bytearray(RING_SIZE)
+        self.mv = memoryview(self.ring)
+        self.head = self.tail = 0  # unparsed bytes are ring[head:tail]
+
+    def poll(self):
+        # read whatever is buffered, dispatch complete lines; returns bytes read
+        ring, mv = self.ring, self.mv
+        head, tail = self.head, self.tail
+        if tail == RING_SIZE:
+            if head == 0:
+                head = tail = 0  # no newline in a full ring: drop it
+            else:
+                # move the partial line to the front so reads stay contiguous
+                ring[:tail-head] = mv[head:tail]
+                tail -= head; head = 0
+        want = min(self.ser.in_waiting, RING_SIZE - tail)
+        n = self.ser.readinto(mv[tail:tail+want]) if want else 0
+        scan = tail  # nothing before the old tail holds a newline
+        tail += n
+        while True:
+            i = ring.find(b"\n", scan, tail)
+            if i < 0: break
+            line = bytes(mv[head:i]).translate(None, LINE_JUNK)
+            head = scan = i + 1
+            if line: dispatch_line(line)
+        if head == tail:
+            head = tail = 0
+        self.head, self.tail = head, tail
+        return n
+
+    def close(self):
+        try:
+            self.ser.close()
+        except Exception:
+            pass
+
+def serial_loop(ports):
+    # all ports in one thread: select() on POSIX, in_waiting polling on Windows
+    # (pyserial's Windows handles are not selectable)
+    readers = []
+    for pn in ports:
+        try:
+            readers.append(PortReader(pn))
+            print(f"[SER] open {pn} @ {BAUD}")
+        except Exception as e:
+            print(f"[SER] {pn} error:", e)
+
+    sel = None
+    if os.name != "nt":
+        sel = selectors.DefaultSelector()
+        for r in readers:
+            sel.register(r.ser.fileno(), selectors.EVENT_READ, data=r)
+
+    while readers:
+        ready = [key.data for key, _ in sel.select(0.01)] if sel else readers
+        got = 0
+        for r in list(ready):
+            try:
+                got += r.poll()
+            except Exception as e:
+                print(f"[SER] {r.name} error:", e)
+                if sel: sel.unregister(r.ser.fileno())
+                r.close()
+                readers.remove(r)
+        if not sel and not got:
+            time.sleep(0.001)
 
 def main():
     ports=["COM14","COM17"]  # find_microbit_ports()
@@ -272,11 +469,9 @@ def main():
     #     print("[ERR] No micro:bit ports found. Plug them in and re-run.")
     #     sys.exit(1)
     # print("[SER] opening:", ports)
-    threads = []
-    for pn in ports:
-        t = threading.Thread(target=reader_thread, args=(pn,), daemon=True)
-        t.start()
-        threads.append(t)
+    threading.Thread(target=log_pump, daemon=True).start()
+    threading.Thread(target=midi_pump, daemon=True).start()
+    threading.Thread(target=serial_loop, args=(ports,), daemon=True).start()
     print("[BRIDGE] running. Ctrl+C to exit.")
     try:
         while True:
@@ -11,19 +11,19 @@
 # Anti-clockwise = increase (set INVERT=True to flip).
 
 from microbit import *
-import math
 
 DEV = 2
 
 # ---------- TUNING ----------
 SEND_MS   = 120     # how often to send while held (ms)
-SMOOTH_A  = 0.25    # EMA on value 0..127 (higher = snappier)
+PIN_SCAN_MS = 5     # how often to scan the hold pins (ms)
+SMOOTH_SHIFT = 2    # EMA on value, alpha = 1/2**SHIFT (lower = snappier)
 DEADBAND  = 2       # only send if value changed by >= this
 INVERT    = False   # False: anti-clockwise increases; True: flip direction
 
 # Sensitivity: degrees needed to sweep the whole 0..127 (per hold)
 # e.g. 180 -> big turns; 90 -> smaller turns = more sensitive.
-GAIN_DEG_PER_FULL = 180.0
+GAIN_DEG_PER_FULL = 180
 
 DEFAULT_VOL = 96    # initial velocity for pitch glove (bridge uses this)
 
@@ -35,37 +35,70 @@ PIN_MOD = pin12
 for p in (PIN_VOL, PIN_REV, PIN_DEL, PIN_MOD):
     p.set_pull(p.PULL_DOWN)
 
-def send(s): print(s)
+# Each message kind gets its own buffer with the constant prefix (which
+# includes DEV) written once at load; emit() only fills in the value and
+# sends the line with a single uart.write (no print()/format per frame).
+def line_buf(prefix):
+    return bytearray((prefix + "0000").encode())  # room for "127\n"
+
+def emit(buf, val):
+    # val in 0..999 goes right after the prefix
+    i = len(buf) - 4
+    if val >= 100:
+        buf[i] = 48 + val // 100
+        i += 1
+    if val >= 10:
+        buf[i] = 48 + val // 10 % 10
+        i += 1
+    buf[i] = 48 + val % 10
+    buf[i + 1] = 10       # '\n'
+    uart.write(buf[:i + 2])
+
+OUT_V  = line_buf("V,{},".format(DEV))
+OUT_VH = line_buf("B,{},VH,".format(DEV))
+
 def clamp(v, lo, hi): return lo if v < lo else hi if v > hi else v
 
-# --- Angle helpers ---
+# --- Angle helpers (integer only: MicroPython floats are boxed and slow) ---
+# ATAN_LUT[k] = round(degrees(atan(k / 64))), k = 0..64
+ATAN_LUT = bytes((
+    0, 1, 2, 3, 4, 4, 5, 6, 7, 8, 9, 10, 11, 11, 12, 13,
+    14, 15, 16, 17, 17, 18, 19, 20, 21, 21, 22, 23, 24, 24, 25, 26,
+    27, 27, 28, 29, 29, 30, 31, 31, 32, 33, 33, 34, 35, 35, 36, 36,
+    37, 37, 38, 39, 39, 40, 40, 41, 41, 42, 42, 43, 43, 44, 44, 45,
+    45,
+))
+
 def roll_degrees():
     # micro:bit axes: x=left/right, y=forward/back, z=up/down
+    # integer atan2(y, z) in degrees, -180..+180
     y = accelerometer.get_y()
     z = accelerometer.get_z()
-    ang = math.degrees(math.atan2(y, z))  # -180..+180
-    return ang
-
-def wrap_deg(d):
-    while d > 180: d -= 360
-    while d < -180: d += 360
-    return d
+    ay = -y if y < 0 else y
+    az = -z if z < 0 else z
+    if ay <= az:
+        if az == 0: return 0
+        ang = ATAN_LUT[((ay << 7) // az + 1) >> 1]
+    else:
+        ang = 90 - ATAN_LUT[((az << 7) // ay + 1) >> 1]
+    if z < 0: ang = 180 - ang
+    return -ang if y < 0 else ang
 
 # --- Per-control incremental state ---
 class IncCtrl:
-    def __init__(self, name, start_val):
+    def __init__(self, name, start_val, out):
         self.name = name
+        self.out = out           # line_buf() this control emits into
         self.active = 0
-        self.last_angle = 0.0    # previous sampled angle while active
-        self.val = start_val     # current 0..127 value
-        self.smooth_val = None   # EMA state
+        self.last_angle = 0      # previous sampled angle while active (int degrees)
+        # value and EMA state in 1/256 steps so small nudges accumulate
+        self.val_q = start_val << 8
+        self.smooth_q = self.val_q
         self.last_sent = None    # last value we emitted
 
     def on_press(self):
         self.active = 1
         self.last_angle = roll_degrees()
-        if self.smooth_val is None:
-            self.smooth_val = self.val
         display.show(self.name[0])  # 'V','R','D','M'
 
     def on_release(self):
@@ -75,99 +108,80 @@ class IncCtrl:
     def tick(self):
         # incremental: add small change from angle delta since last sample
         cur = roll_degrees()
-        delta_deg = wrap_deg(cur - self.last_angle)
+        delta_deg = (cur - self.last_angle + 540) % 360 - 180  # wrapped to -180..+179
         if INVERT:
             delta_deg = -delta_deg
 
         # map degrees to value change
         # e.g., if GAIN_DEG_PER_FULL = 180, then 180° => +/-127
-        step = (delta_deg / GAIN_DEG_PER_FULL) * 127.0
+        step_q = (delta_deg * (127 << 8)) // GAIN_DEG_PER_FULL
         # accumulate into value and clamp
-        self.val = int(round(clamp(self.val + step, 0, 127)))
+        self.val_q = clamp(self.val_q + step_q, 0, 127 << 8)
 
         # smoothing in value domain
-        if self.smooth_val is None:
-            self.smooth_val = self.val
-        else:
-            self.smooth_val = int(round(SMOOTH_A * self.val + (1.0 - SMOOTH_A) * self.smooth_val))
+        self.smooth_q += (self.val_q - self.smooth_q) >> SMOOTH_SHIFT
 
         # update last_angle to current so small nudges always work
         self.last_angle = cur
-        return self.smooth_val
+        return (self.smooth_q + 128) >> 8
 
 # initial defaults
-ctrl_vol = IncCtrl("VOL", DEFAULT_VOL)
-ctrl_rev = IncCtrl("REV", 0)
-ctrl_del = IncCtrl("DEL", 0)
-ctrl_mod = IncCtrl("MOD", 0)
-
-last_vh = 0
-last_send = running_time()
+ctrl_vol = IncCtrl("VOL", DEFAULT_VOL, OUT_V)                        # CC11
+ctrl_rev = IncCtrl("REV", 0, line_buf("E,{},REV,".format(DEV)))      # CC91
+ctrl_del = IncCtrl("DEL", 0, line_buf("E,{},DEL,".format(DEV)))      # CC94
+ctrl_mod = IncCtrl("MOD", 0, line_buf("E,{},MOD,".format(DEV)))      # CC1 (mod wheel)
+
+CONTROLS = (
+    (PIN_VOL, ctrl_vol),
+    (PIN_REV, ctrl_rev),
+    (PIN_DEL, ctrl_del),
+    (PIN_MOD, ctrl_mod),
+)
+
+def scan_pins():
+    # edge handling per control; returns VH = any control held
+    vh = 0
+    for pin, ctrl in CONTROLS:
+        held = pin.read_digital()   # HIGH when touched
+        if held:
+            vh = 1
+            if not ctrl.active: ctrl.on_press()
+        elif ctrl.active:
+            ctrl.on_release()
+    return vh
+
+vh = last_vh = 0
 
 # Seed bridge with initial velocity (for future notes)
-send("V,{},{}".format(DEV, DEFAULT_VOL))
+emit(OUT_V, DEFAULT_VOL)
 display.show(Image.HEART)
 sleep(300)
 display.clear()
 
+next_pin_tick = next_send_tick = running_time()
 while True:
-    # Read holds (HIGH when touched)
-    h_vol = 1 if PIN_VOL.read_digital() else 0
-    h_rev = 1 if PIN_REV.read_digital() else 0
-    h_del = 1 if PIN_DEL.read_digital() else 0
-    h_mod = 1 if PIN_MOD.read_digital() else 0
-
-    # Edge handling per control
-    if h_vol and not ctrl_vol.active: ctrl_vol.on_press()
-    if (not h_vol) and ctrl_vol.active: ctrl_vol.on_release()
-
-    if h_rev and not ctrl_rev.active: ctrl_rev.on_press()
-    if (not h_rev) and ctrl_rev.active: ctrl_rev.on_release()
-
-    if h_del and not ctrl_del.active: ctrl_del.on_press()
-    if (not h_del) and ctrl_del.active: ctrl_del.on_release()
-
-    if h_mod and not ctrl_mod.active: ctrl_mod.on_press()
-    if (not h_mod) and ctrl_mod.active: ctrl_mod.on_release()
-
-    # Overall VH = any control held (good for the bridge’s gating/UX)
-    vh = 1 if (h_vol or h_rev or h_del or h_mod) else 0
-    if vh != last_vh:
-        send("B,{},VH,{}".format(DEV, vh))
-        display.show("H" if vh else " ")
-        last_vh = vh
-
-    if vh == 0:
-        sleep(15)
-        continue
-
-    # Rate-limited sending
     now = running_time()
-    if now - last_send >= SEND_MS:
-        if ctrl_vol.active:
-            v = ctrl_vol.tick()
-            if ctrl_vol.last_sent is None or abs(v - ctrl_vol.last_sent) >= DEADBAND:
-                send("V,{},{}".format(DEV, v))           # CC11
-                ctrl_vol.last_sent = v
-
-        if ctrl_rev.active:
-            v = ctrl_rev.tick()
-            if ctrl_rev.last_sent is None or abs(v - ctrl_rev.last_sent) >= DEADBAND:
-                send("E,{},REV,{}".format(DEV, v))       # CC91
-                ctrl_rev.last_sent = v
-
-        if ctrl_del.active:
-            v = ctrl_del.tick()
-            if ctrl_del.last_sent is None or abs(v - ctrl_del.last_sent) >= DEADBAND:
-                send("E,{},DEL,{}".format(DEV, v))       # CC94
-                ctrl_del.last_sent = v
-
-        if ctrl_mod.active:
-            v = ctrl_mod.tick()
-            if ctrl_mod.last_sent is None or abs(v - ctrl_mod.last_sent) >= DEADBAND:
-                send("E,{},MOD,{}".format(DEV, v))       # CC1 (mod wheel)
-                ctrl_mod.last_sent = v
-
-        last_send = now
-
-    sleep(15)
+
+    if now >= next_pin_tick:
+        vh = scan_pins()
+        # Overall VH = any control held (good for the bridge’s gating/UX)
+        if vh != last_vh:
+            emit(OUT_VH, vh)
+            display.show("H" if vh else " ")
+            last_vh = vh
+        next_pin_tick = now + PIN_SCAN_MS
+
+    # Rate-limited sending while anything is held
+    if vh and now >= next_send_tick:
+        for pin, ctrl in CONTROLS:
+            if ctrl.active:
+                v = ctrl.tick()
+                if ctrl.last_sent is None or abs(v - ctrl.last_sent) >= DEADBAND:
+                    emit(ctrl.out, v)
+                    ctrl.last_sent = v
+        next_send_tick = now + SEND_MS
+
+    if vh:
+        sleep(max(0, min(next_pin_tick, next_send_tick) - running_time()))
+    else:
+        sleep(max(0, next_pin_tick - running_time()))
@@ -51,13 +51,23 @@ ALL = [
     ("E",     RE_E),
 ]
 
+# ---- one alternation over ALL ----
+# Group names must be unique across alternatives, so each inner group gets
+# its kind appended (dev -> dev_B_NH); GROUPS maps them back for classify().
+def _tagged(name, rx):
+    body = rx.pattern[1:-1]                       # drop ^ and $
+    return re.sub(r'\(\?P<(\w+)>', rf'(?P<\1_{name}>', body)
+
+MASTER = re.compile('(?:' + '|'.join(rf'(?P<{name}>{_tagged(name, rx)})' for name, rx in ALL) + ')$')
+GROUPS = {name: [(f"{g}_{name}", g) for g in rx.groupindex] for name, rx in ALL}
+
 def classify(line: str):
     """Return (name, match_groups) or (None, None)."""
-    for name, rx in ALL:
-        m = rx.match(line)
-        if m:
-            return name, m.groupdict()
-    return None, None
+    m = MASTER.match(line)
+    if not m:
+        return None, None
+    name = m.lastgroup
+    return name, {g: m.group(tagged) for tagged, g in GROUPS[name]}
 
 if __name__ == "__main__":
     # sample lines (you can replace with your own)
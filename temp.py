@@ -7,8 +7,10 @@ BASE_NOTE = 60        # C4
 OCT_STEP  = 12
 Y_THRESH  = (-400, -100, 200, 500)  # y-accel zones
 LADDER_ST = [0, 2, 4, 5, 7]        # pentatonic degrees
-SMOOTH_ALPHA  = 0.25
+SMOOTH_SHIFT  = 2     # EMA alpha = 1/2**SHIFT
 PITCH_SEND_MS = 90
+ACCEL_MS      = 18    # accelerometer sample period (EMA input)
+PIN_SCAN_MS   = 5     # finger pin scan period
 
 # finger pins (match your wiring)
 PIN_NH   = pin1   # hold-to-play
@@ -20,7 +22,31 @@ PIN_SUS  = pin12  # sustain toggle
 for p in (PIN_NH, PIN_OCTU, PIN_OCTD, PIN_SUS):
     p.set_pull(p.PULL_DOWN)
 
-def send(s): print(s)
+# Each message kind gets its own buffer with the constant prefix (which
+# includes DEV) written once at load; emit() only fills in the value and
+# sends the line with a single uart.write (no print()/format per frame).
+def line_buf(prefix):
+    return bytearray((prefix + "0000").encode())  # room for "127\n"
+
+def emit(buf, val):
+    # val in 0..999 goes right after the prefix
+    i = len(buf) - 4
+    if val >= 100:
+        buf[i] = 48 + val // 100
+        i += 1
+    if val >= 10:
+        buf[i] = 48 + val // 10 % 10
+        i += 1
+    buf[i] = 48 + val % 10
+    buf[i + 1] = 10       # '\n'
+    uart.write(buf[:i + 2])
+
+OUT_NH  = line_buf("B,{},NH,".format(DEV))
+OUT_SUS = line_buf("B,{},SUS,".format(DEV))
+OUT_P   = line_buf("P,{},".format(DEV))
+MSG_OCT_UP   = "B,{},OCT,+1\n".format(DEV).encode()
+MSG_OCT_DOWN = "B,{},OCT,-1\n".format(DEV).encode()
+
 def clamp(v, lo, hi): return lo if v < lo else hi if v > hi else v
 
 def y_to_semitone(y):
@@ -34,73 +60,78 @@ def y_to_semitone(y):
 # ------------ STATE ------------
 octave_offset = 0
 sustain_on    = 0
-nh = last_nh = last_octu = last_octd = last_sus = 0
+nh = 0
 smooth_y = accelerometer.get_y()
-last_pitch_send = running_time()
 last_note_num = None
 
-# simple debounce helper
-def edge(curr, prev, min_ms, stamp):
-    now = running_time()
-    if curr != prev and now - stamp >= min_ms:
-        return True, now
-    return False, stamp
-
-db_nh = db_octu = db_octd = db_sus = 0  # last change times
-
-# ------------ MAIN ------------
-while True:
-    nh_now   = PIN_NH.read_digital()   # 1 when touched
-    octu_now = PIN_OCTU.read_digital()
-    octd_now = PIN_OCTD.read_digital()
-    sus_now  = PIN_SUS.read_digital()
-
-    # NH edge with 30ms debounce
-    chg, db_nh = edge(nh_now, last_nh, 30, db_nh)
-    if chg:
-        nh = nh_now
-        send("B,{},{},{}".format(DEV, "NH", nh))
-        display.show("♪" if nh else " ")
-        last_nh = nh_now
-
-    # OCT+ edge
-    chg, db_octu = edge(octu_now, last_octu, 40, db_octu)
-    if chg and octu_now == 1:
+# ------------ CONTROLS ------------
+# each handler gets the new (debounced) pin level
+def on_nh(level):
+    global nh
+    nh = level
+    emit(OUT_NH, nh)
+    display.show("♪" if nh else " ")
+
+def on_octu(level):
+    global octave_offset
+    if level == 1:
         octave_offset = clamp(octave_offset + OCT_STEP, -24, 36)
-        send("B,{},{},{}".format(DEV, "OCT", "+1"))
+        uart.write(MSG_OCT_UP)
         display.show("+")
 
-    last_octu = octu_now
-
-    # OCT- edge
-    chg, db_octd = edge(octd_now, last_octd, 40, db_octd)
-    if chg and octd_now == 1:
+def on_octd(level):
+    global octave_offset
+    if level == 1:
         octave_offset = clamp(octave_offset - OCT_STEP, -24, 36)
-        send("B,{},{},{}".format(DEV, "OCT", "-1"))
+        uart.write(MSG_OCT_DOWN)
         display.show("-")
 
-    last_octd = octd_now
-
+def on_sus(level):
     # SUS toggle on rising edge
-    chg, db_sus = edge(sus_now, last_sus, 80, db_sus)
-    if chg and sus_now == 1:
+    global sustain_on
+    if level == 1:
         sustain_on = 0 if sustain_on else 1
-        send("B,{},{},{}".format(DEV, "SUS", sustain_on))
+        emit(OUT_SUS, sustain_on)
         display.show("S" if sustain_on else " ")
-    last_sus = sus_now
 
-    # pure acceleration -> pitch
-    y = accelerometer.get_y()
-    smooth_y = SMOOTH_ALPHA * y + (1 - SMOOTH_ALPHA) * smooth_y
-    st = y_to_semitone(smooth_y)
-    note_num = clamp(BASE_NOTE + st + octave_offset, 0, 127)
+# [pin, debounce ms, handler, last level, last change time]
+CONTROLS = [
+    [PIN_NH,   30, on_nh,   0, 0],
+    [PIN_OCTU, 40, on_octu, 0, 0],
+    [PIN_OCTD, 40, on_octd, 0, 0],
+    [PIN_SUS,  80, on_sus,  0, 0],
+]
+
+def scan_pins(now):
+    for c in CONTROLS:
+        level = c[0].read_digital()   # 1 when touched
+        if level != c[3] and now - c[4] >= c[1]:
+            c[3] = level
+            c[4] = now
+            c[2](level)
 
-    # throttled pitch messages
+# ------------ MAIN ------------
+next_pin_tick = next_accel_tick = next_pitch_tick = running_time()
+while True:
     now = running_time()
-    if now - last_pitch_send >= PITCH_SEND_MS:
+
+    if now >= next_pin_tick:
+        scan_pins(now)
+        next_pin_tick = now + PIN_SCAN_MS
+
+    # pure acceleration -> pitch (sampled at its own rate so the EMA keeps its feel)
+    if now >= next_accel_tick:
+        y = accelerometer.get_y()
+        smooth_y += (y - smooth_y) >> SMOOTH_SHIFT
+        next_accel_tick = now + ACCEL_MS
+
+    # throttled pitch messages
+    if now >= next_pitch_tick:
+        st = y_to_semitone(smooth_y)
+        note_num = clamp(BASE_NOTE + st + octave_offset, 0, 127)
         if (note_num != last_note_num) or nh == 1:
-            send("P,{},{}".format(DEV, note_num))
+            emit(OUT_P, note_num)
             last_note_num = note_num
-        last_pitch_send = now
+        next_pitch_tick = now + PITCH_SEND_MS
 
-    sleep(18)
+    sleep(max(0, min(next_pin_tick, next_accel_tick, next_pitch_tick) - running_time()))